@@ -1,5 +1,8 @@
 import json
+import math
+import time
 from abc import ABC, abstractmethod
+from collections import Counter
 from functools import wraps
 
 import psycopg2
@@ -31,20 +34,76 @@ def countable(original_method):
     return wrapper
 
 
+class FenwickTree:
+    def __init__(self, size):
+        self.size = size
+        self._tree = [0] * (size + 1)
+
+    def add(self, index, delta):
+        index += 1
+        while index <= self.size:
+            self._tree[index] += delta
+            index += index & -index
+
+    def prefix_sum(self, index):
+        index = min(index, self.size - 1) + 1
+        total = 0
+        while index > 0:
+            total += self._tree[index]
+            index -= index & -index
+        return total
+
+    def range_sum(self, low, high):
+        if low > high:
+            return 0
+        return self.prefix_sum(high) - (self.prefix_sum(low - 1) if low > 0 else 0)
+
+
 class Delegat:
     _instance = None
     _connection = None
-
-    def __new__(cls, db_config=None):
+    replica_configs = ()
+    read_your_writes = 0
+    _replica_connections = ()
+    _replica_retry_at = ()
+    _replica_checked_at = ()
+    _replica_lag = ()
+    _next_replica = 0
+    _last_write_at = None
+    REPLICA_RETRY_INTERVAL = 30
+    REPLICA_HEALTH_CHECK_INTERVAL = 5
+    MAX_REPLICA_LAG = 10
+    REPLICA_CONNECT_TIMEOUT = 2
+    REPLICA_PROBE_TIMEOUT_MS = 1000
+    REPLICA_LAG_QUERY = """
+    SELECT CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+    """
+
+    def __new__(cls, db_config=None, replica_configs=None, read_your_writes=0):
         if cls._instance is None:
             cls._instance = super(Delegat, cls).__new__(cls)
             if db_config:
-                cls._instance._initialize(db_config)
+                cls._instance._initialize(db_config, replica_configs, read_your_writes)
         return cls._instance
 
-    def _initialize(self, db_config):
+    def _initialize(self, db_config, replica_configs=None, read_your_writes=0):
         self.db_config = db_config
+        self.replica_configs = [dict(config) for config in replica_configs or []]
+        for config in self.replica_configs:
+            config.setdefault('connect_timeout', self.REPLICA_CONNECT_TIMEOUT)
+        self.read_your_writes = read_your_writes
+        self._replica_connections = [None] * len(self.replica_configs)
+        self._replica_retry_at = [0] * len(self.replica_configs)
+        self._replica_checked_at = [None] * len(self.replica_configs)
+        self._replica_lag = [None] * len(self.replica_configs)
+        self._next_replica = 0
+        self._last_write_at = None
         self._create_connection()
+        for i in range(len(self.replica_configs)):
+            self._create_replica_connection(i)
 
     def _create_connection(self):
         try:
@@ -53,13 +112,91 @@ class Delegat:
             print(f"Ошибка подключения к БД: {e}")
             self._connection = None
 
+    def _create_replica_connection(self, index):
+        try:
+            connection = psycopg2.connect(**self.replica_configs[index])
+            connection.autocommit = True
+            self._replica_connections[index] = connection
+            self._replica_checked_at[index] = None
+        except psycopg2.Error as e:
+            print(f"Ошибка подключения к реплике {index}: {e}")
+            self._mark_replica_down(index)
+
+    def _mark_replica_down(self, index):
+        connection = self._replica_connections[index]
+        if connection and not connection.closed:
+            connection.close()
+        self._replica_connections[index] = None
+        self._replica_lag[index] = None
+        self._replica_retry_at[index] = time.monotonic() + self.REPLICA_RETRY_INTERVAL
+
+    def _probe_replica(self, index):
+        try:
+            with self._replica_connections[index].cursor() as cursor:
+                cursor.execute("SET statement_timeout = %s", (self.REPLICA_PROBE_TIMEOUT_MS,))
+                cursor.execute(self.REPLICA_LAG_QUERY)
+                lag = cursor.fetchall()[0][0]
+                cursor.execute("RESET statement_timeout")
+            return float(lag)
+        except Exception as e:
+            print(f"Реплика {index} не прошла проверку: {e}")
+            self._mark_replica_down(index)
+            return None
+
+    def _is_replica_healthy(self, index):
+        now = time.monotonic()
+        connection = self._replica_connections[index]
+        if not connection or connection.closed:
+            if now < self._replica_retry_at[index]:
+                return False
+            self._create_replica_connection(index)
+            if self._replica_connections[index] is None:
+                return False
+        checked_at = self._replica_checked_at[index]
+        if checked_at is None or now - checked_at >= self.REPLICA_HEALTH_CHECK_INTERVAL:
+            self._replica_checked_at[index] = now
+            self._replica_lag[index] = self._probe_replica(index)
+        lag = self._replica_lag[index]
+        if lag is None:
+            return False
+        return self.MAX_REPLICA_LAG is None or lag <= self.MAX_REPLICA_LAG
+
+    def _in_read_your_writes_window(self):
+        if not self.read_your_writes or self._last_write_at is None:
+            return False
+        return time.monotonic() - self._last_write_at < self.read_your_writes
+
+    def _pick_replica(self):
+        count = len(self._replica_connections)
+        if not count or self._in_read_your_writes_window():
+            return None
+        for _ in range(count):
+            index = self._next_replica
+            self._next_replica = (self._next_replica + 1) % count
+            if self._is_replica_healthy(index):
+                return index
+        return None
+
+    def _fetch_all(self, connection, query, params):
+        with connection.cursor() as cursor:
+            cursor.execute(query, params or ())
+            return cursor.fetchall()
+
     def execute_query(self, query, params=None):
+        index = self._pick_replica()
+        if index is not None:
+            try:
+                return self._fetch_all(self._replica_connections[index], query, params)
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                print(f"Ошибка чтения с реплики {index}, переключение на основную БД: {e}")
+                self._mark_replica_down(index)
+            except Exception as e:
+                print(f"Ошибка выполнения запроса: {e}")
+                return None
         try:
             if not self._connection:
                 raise ConnectionError("Нет подключения к БД")
-            with self._connection.cursor() as cursor:
-                cursor.execute(query, params or ())
-                return cursor.fetchall()
+            return self._fetch_all(self._connection, query, params)
         except Exception as e:
             print(f"Ошибка выполнения запроса: {e}")
             return None
@@ -71,6 +208,7 @@ class Delegat:
             with self._connection.cursor() as cursor:
                 cursor.execute(query, params or ())
                 self._connection.commit()
+                self._last_write_at = time.monotonic()
                 return cursor.rowcount
         except Exception as e:
             print(f"Ошибка выполнения команды: {e}")
@@ -82,12 +220,17 @@ class Delegat:
                 cursor.execute(query, params)
                 new_id = cursor.fetchone()[0]
                 self._connection.commit()
+                self._last_write_at = time.monotonic()
                 return new_id
         except Exception as e:
             print(f"Ошибка при выполнении INSERT: {e}")
             return -1
 
     def close_connection(self):
+        for connection in self._replica_connections:
+            if connection and not connection.closed:
+                connection.close()
+        self._replica_connections = []
         if self._connection:
             self._connection.close()
             self._connection = None
@@ -121,10 +264,14 @@ class ActorRep(ABC):
 
 
 class ActorRepJson(ActorRep):
+    COUNTED_FIELDS = ('Фамилия', 'Стаж')
+    MAX_STAZ = 100
+
     def __init__(self, filename="actors.json"):
         self.filename = filename
         self.data = []
         self._load_data()
+        self._rebuild_aggregates()
 
     def _load_data(self):
         try:
@@ -170,9 +317,84 @@ class ActorRepJson(ActorRep):
         reverse = sort_order.upper() == 'DESC'
         return sorted(data, key=lambda x: x.get(sort_by, ''), reverse=reverse)
 
+    def _rebuild_aggregates(self):
+        self._staz_tree = FenwickTree(self.MAX_STAZ + 1)
+        self._staz_untracked = 0
+        self._field_counts = {field: Counter() for field in self.COUNTED_FIELDS}
+        self._field_untracked = {field: 0 for field in self.COUNTED_FIELDS}
+        self._aggregate_rows = []
+        for actor_data in self.data:
+            self._add_aggregate_row(self._aggregate_snapshot(actor_data))
+
+    @staticmethod
+    def _is_hashable(value):
+        try:
+            hash(value)
+        except TypeError:
+            return False
+        return True
+
+    def _aggregate_snapshot(self, actor_data):
+        fields = set(self.COUNTED_FIELDS) | {'Стаж'}
+        return {field: actor_data[field] for field in fields if field in actor_data}
+
+    def _add_aggregate_row(self, snapshot, index=None):
+        if index is None:
+            self._aggregate_rows.append(snapshot)
+        else:
+            self._aggregate_rows[index] = snapshot
+        self._update_aggregates(snapshot, 1)
+
+    def _remove_aggregate_row(self, index):
+        self._update_aggregates(self._aggregate_rows[index], -1)
+
+    def _update_aggregates(self, snapshot, delta):
+        staz = snapshot.get('Стаж')
+        if (isinstance(staz, (int, float)) and math.isfinite(staz) and float(staz).is_integer()
+                and 0 <= staz <= self.MAX_STAZ):
+            self._staz_tree.add(int(staz), delta)
+        elif 'Стаж' in snapshot:
+            self._staz_untracked += delta
+        for field, counts in self._field_counts.items():
+            if field not in snapshot:
+                continue
+            if self._is_hashable(snapshot[field]):
+                counts[snapshot[field]] += delta
+            else:
+                self._field_untracked[field] += delta
+
+    def _count_staz_range(self, min_staz=None, max_staz=None):
+        if self._staz_untracked:
+            return None
+        for value in (min_staz, max_staz):
+            if value is not None and (not isinstance(value, (int, float)) or not math.isfinite(value)):
+                return None
+        low = 0 if min_staz is None else max(0, math.ceil(min_staz))
+        high = self.MAX_STAZ if max_staz is None else min(self.MAX_STAZ, math.floor(max_staz))
+        return self._staz_tree.range_sum(low, high)
+
+    def _get_count_from_aggregates(self, filters):
+        if len(filters) != 1:
+            return None
+        (field, condition), = filters.items()
+        if isinstance(condition, dict):
+            if field == 'Стаж' and condition and set(condition) <= {'min', 'max'}:
+                return self._count_staz_range(condition.get('min'), condition.get('max'))
+            if set(condition) != {'equals'}:
+                return None
+            condition = condition['equals']
+        if field not in self._field_counts or self._field_untracked[field]:
+            return None
+        try:
+            return self._field_counts[field][condition]
+        except TypeError:
+            return None
+
     def _get_count_with_filters(self, filters):
-        filtered_data = self._apply_filters(self.data, filters)
-        return len(filtered_data)
+        count = self._get_count_from_aggregates(filters)
+        if count is None:
+            count = len(self._apply_filters(self.data, filters))
+        return count
 
     def get_by_id(self, actor_id):
         for actor_data in self.data:
@@ -200,7 +422,9 @@ class ActorRepJson(ActorRep):
         else:
             new_id = 1
         actor_data['ID'] = new_id
+        snapshot = self._aggregate_snapshot(actor_data)
         self.data.append(actor_data)
+        self._add_aggregate_row(snapshot)
         self.save_data()
         return new_id
 
@@ -208,7 +432,10 @@ class ActorRepJson(ActorRep):
         for i, actor_data in enumerate(self.data):
             if actor_data.get('ID') == actor_id:
                 new_data['ID'] = actor_id
+                snapshot = self._aggregate_snapshot(new_data)
+                self._remove_aggregate_row(i)
                 self.data[i] = new_data
+                self._add_aggregate_row(snapshot, i)
                 self.save_data()
                 return True
         return False
@@ -217,6 +444,8 @@ class ActorRepJson(ActorRep):
         for i, actor_data in enumerate(self.data):
             if actor_data.get('ID') == actor_id:
                 del self.data[i]
+                self._remove_aggregate_row(i)
+                del self._aggregate_rows[i]
                 self.save_data()
                 return True
         return False
@@ -227,6 +456,7 @@ class ActorRepJson(ActorRep):
 
     def sort_by_experience(self, reverse=False):
         self.data.sort(key=lambda x: x.get('Стаж', 0), reverse=reverse)
+        self._rebuild_aggregates()
         self.save_data()
         return self.data
 
@@ -249,8 +479,10 @@ class ActorRepYaml(ActorRepJson):
 
 
 class ActorRepDB(ActorRep):
-    def __init__(self, db_config_data=None):
-        self.db = Delegat(db_config_data)
+    def __init__(self, db_config_data=None, replica_configs=None, read_your_writes=0,
+                 estimated_count=False):
+        self.db = Delegat(db_config_data, replica_configs, read_your_writes)
+        self.estimated_count = estimated_count
 
     def _apply_filters(self, data, filters):
         filtered_data = []
@@ -368,8 +600,25 @@ class ActorRepDB(ActorRep):
         rows_affected = self.db.execute_command(query, (actor_id,))
         return rows_affected > 0
 
+    def _get_estimated_count(self):
+        query = """
+        SELECT reltuples, relpages, pg_relation_size(oid) / current_setting('block_size')::int
+        FROM pg_class WHERE oid = 'actors'::regclass
+        """
+        result = self.db.execute_query(query)
+        if not result:
+            return None
+        reltuples, relpages, current_pages = result[0]
+        if reltuples <= 0 or relpages <= 0:
+            return None
+        return round(reltuples / relpages * current_pages)
+
     @countable
     def get_count(self, **kwargs):
+        if self.estimated_count:
+            estimate = self._get_estimated_count()
+            if estimate is not None:
+                return estimate
         query = "SELECT COUNT(*) FROM actors"
         result = self.db.execute_query(query)
         return result[0][0] if result else 0
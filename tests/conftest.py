@@ -0,0 +1,31 @@
+import importlib.util
+import os
+
+import pytest
+
+pytest.importorskip("psycopg2")
+pytest.importorskip("yaml")
+
+MODULE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "3p.py")
+
+
+def _load_module():
+    spec = importlib.util.spec_from_file_location("theatre", MODULE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="session")
+def theatre():
+    return _load_module()
+
+
+@pytest.fixture(autouse=True)
+def reset_delegat(theatre):
+    theatre.Delegat._instance = None
+    yield
+    instance = theatre.Delegat._instance
+    if instance is not None:
+        instance.close_connection()
+    theatre.Delegat._instance = None
@@ -0,0 +1,166 @@
+import json
+import random
+
+import pytest
+
+
+def aggregate_filters(names):
+    return [
+        {'Стаж': {'min': 10}},
+        {'Стаж': {'max': 40}},
+        {'Стаж': {'min': 7.5, 'max': 63.2}},
+        {'Стаж': {'min': -5, 'max': 200}},
+        {'Стаж': 15},
+        {'Стаж': {'equals': 15.0}},
+    ] + [{'Фамилия': name} for name in names] + [{'Фамилия': {'equals': names[0]}}]
+
+
+def assert_counts_match(repo, filters):
+    for flt in filters:
+        assert repo._get_count_from_aggregates(flt) is not None, flt
+        assert repo.get_count(filters=flt) == len(repo._apply_filters(repo.data, flt)), flt
+
+
+@pytest.fixture
+def json_repo(theatre, tmp_path):
+    path = tmp_path / "actors.json"
+    path.write_text("[]", encoding="utf-8")
+    return theatre.ActorRepJson(str(path))
+
+
+@pytest.fixture
+def yaml_repo(theatre, tmp_path):
+    return theatre.ActorRepYaml(str(tmp_path / "actors.yaml"))
+
+
+@pytest.mark.parametrize("repo_name", ["json_repo", "yaml_repo"])
+def test_aggregates_match_scan_after_changes(request, repo_name):
+    repo = request.getfixturevalue(repo_name)
+    rng = random.Random(27)
+    names = ['Иванов', 'Петров', 'Сидоров']
+    filters = aggregate_filters(names)
+    for _ in range(200):
+        action = rng.random()
+        actor = {'Фамилия': rng.choice(names), 'Стаж': rng.randint(0, 100), 'ФИО': 'Иванов Иван'}
+        if action < 0.5 or not repo.data:
+            repo.add_actor(actor)
+        elif action < 0.75:
+            repo.update_actor(rng.choice(repo.data)['ID'], actor)
+        else:
+            repo.delete_actor(rng.choice(repo.data)['ID'])
+        assert_counts_match(repo, filters)
+
+
+def test_aggregates_rebuilt_on_load(theatre, json_repo):
+    for staz in (5, 15, 25):
+        json_repo.add_actor({'Фамилия': 'Иванов', 'Стаж': staz})
+    reloaded = theatre.ActorRepJson(json_repo.filename)
+    assert reloaded.get_count(filters={'Стаж': {'min': 10}}) == 2
+    assert reloaded.get_count(filters={'Фамилия': 'Иванов'}) == 3
+
+
+def test_update_with_stored_dict(json_repo):
+    actor_id = json_repo.add_actor({'Фамилия': 'A', 'Стаж': 5})
+    actor = json_repo.get_by_id(actor_id)
+    actor['Стаж'] = 50
+    actor['Фамилия'] = 'B'
+    assert json_repo.update_actor(actor_id, actor)
+    assert json_repo.get_count(filters={'Стаж': 5}) == 0
+    assert json_repo.get_count(filters={'Стаж': {'min': 40}}) == 1
+    assert json_repo.get_count(filters={'Фамилия': 'A'}) == 0
+    assert json_repo.get_count(filters={'Фамилия': 'B'}) == 1
+    assert json_repo.delete_actor(actor_id)
+    assert json_repo.get_count(filters={'Стаж': {'min': 40}}) == 0
+    assert json_repo.get_count(filters={'Фамилия': 'B'}) == 0
+
+
+def test_integral_float_staz_uses_tree(json_repo):
+    json_repo.add_actor({'Фамилия': 'A', 'Стаж': 5.0})
+    json_repo.add_actor({'Фамилия': 'B', 'Стаж': 12})
+    assert json_repo._staz_untracked == 0
+    assert_counts_match(json_repo, [{'Стаж': {'min': 5, 'max': 5}}, {'Стаж': {'max': 4.9}}])
+
+
+def test_fractional_staz_falls_back_to_scan(json_repo):
+    json_repo.add_actor({'Фамилия': 'A', 'Стаж': 5.5})
+    assert json_repo._get_count_from_aggregates({'Стаж': {'min': 5}}) is None
+    assert json_repo.get_count(filters={'Стаж': {'min': 5}}) == 1
+    json_repo.delete_actor(1)
+    assert json_repo._get_count_from_aggregates({'Стаж': {'min': 5}}) == 0
+
+
+@pytest.mark.parametrize("bound", [float('inf'), float('-inf'), float('nan')])
+def test_non_finite_bounds_fall_back_to_scan(json_repo, bound):
+    json_repo.add_actor({'Фамилия': 'A', 'Стаж': 5})
+    for flt in ({'Стаж': {'min': bound}}, {'Стаж': {'max': bound}}):
+        assert json_repo._get_count_from_aggregates(flt) is None
+        assert json_repo.get_count(filters=flt) == len(json_repo._apply_filters(json_repo.data, flt))
+
+
+def test_unhashable_field_on_load_falls_back_to_scan(theatre, tmp_path):
+    path = tmp_path / "actors.json"
+    path.write_text(json.dumps([{"ID": 1, "Фамилия": ["a"], "Стаж": 1}]), encoding="utf-8")
+    repo = theatre.ActorRepJson(str(path))
+    assert repo._get_count_from_aggregates({'Фамилия': ['a']}) is None
+    assert repo.get_count(filters={'Фамилия': ['a']}) == 1
+    assert repo.get_count(filters={'Фамилия': 'a'}) == 0
+    assert repo.get_count(filters={'Стаж': {'min': 1}}) == 1
+
+
+def test_unhashable_field_on_add(json_repo):
+    json_repo.add_actor({'Фамилия': 'A', 'Стаж': 1})
+    actor_id = json_repo.add_actor({'Фамилия': {'x': 1}, 'Стаж': 1})
+    assert len(json_repo.data) == 2
+    assert json_repo._get_count_from_aggregates({'Фамилия': 'A'}) is None
+    assert json_repo.get_count(filters={'Фамилия': 'A'}) == 1
+    assert json_repo.get_count(filters={'Фамилия': {'equals': {'x': 1}}}) == 1
+    assert json_repo.get_count(filters={'Стаж': 1}) == 2
+    assert json_repo.update_actor(actor_id, {'Фамилия': 'B', 'Стаж': 3})
+    assert_counts_match(json_repo, [{'Фамилия': 'A'}, {'Фамилия': 'B'}, {'Стаж': {'min': 2}}])
+    assert json_repo.update_actor(actor_id, {'Фамилия': ['c'], 'Стаж': 3})
+    assert json_repo.delete_actor(actor_id)
+    assert_counts_match(json_repo, [{'Фамилия': 'A'}, {'Стаж': {'min': 1}}])
+
+
+def test_combined_filters_fall_back_to_scan(json_repo):
+    json_repo.add_actor({'Фамилия': 'A', 'Стаж': 5})
+    json_repo.add_actor({'Фамилия': 'A', 'Стаж': 25})
+    flt = {'Фамилия': 'A', 'Стаж': {'min': 10}}
+    assert json_repo._get_count_from_aggregates(flt) is None
+    assert json_repo.get_count(filters=flt) == 1
+
+
+class FakeDelegat:
+    def __init__(self, stats, exact_count):
+        self.stats = stats
+        self.exact_count = exact_count
+        self.queries = []
+
+    def execute_query(self, query, params=None):
+        self.queries.append(query)
+        if 'pg_class' in query:
+            return [self.stats] if self.stats else []
+        return [(self.exact_count,)]
+
+
+@pytest.mark.parametrize("stats, expected", [
+    ((1000.0, 10, 10), 1000),
+    ((1000.0, 10, 15), 1500),
+    ((1000.0, 10, 0), 0),
+    ((333.0, 7, 9), 428),
+    ((-1.0, 0, 4), 7),
+    ((0.0, 0, 0), 7),
+    ((0.0, 3, 3), 7),
+    (None, 7),
+])
+def test_estimated_count(theatre, stats, expected):
+    repo = theatre.ActorRepDB(estimated_count=True)
+    repo.db = FakeDelegat(stats, 7)
+    assert repo.get_count() == expected
+
+
+def test_estimated_count_is_opt_in(theatre):
+    repo = theatre.ActorRepDB()
+    repo.db = FakeDelegat((1000.0, 10, 10), 7)
+    assert repo.get_count() == 7
+    assert all('pg_class' not in query for query in repo.db.queries)
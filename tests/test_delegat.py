@@ -0,0 +1,177 @@
+import os
+
+import psycopg2
+import pytest
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rowcount = 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, query, params=None):
+        if query.startswith(("SET", "RESET")):
+            self.connection.settings.append((query, params))
+            return
+        if query == self.connection.lag_query:
+            self.result = [(self.connection.lag,)]
+            return
+        if self.connection.error is not None:
+            raise self.connection.error
+        self.connection.queries.append(query)
+        self.result = [(self.connection.name,)]
+
+    def fetchall(self):
+        return self.result
+
+
+class FakeConnection:
+    def __init__(self, name, lag_query, lag=0):
+        self.name = name
+        self.lag_query = lag_query
+        self.lag = lag
+        self.error = None
+        self.closed = 0
+        self.queries = []
+        self.settings = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+def make_delegat(theatre, replica_count=2, read_your_writes=0):
+    delegat = theatre.Delegat()
+    lag_query = theatre.Delegat.REPLICA_LAG_QUERY
+    delegat._connection = FakeConnection("primary", lag_query)
+    delegat.replica_configs = [{} for _ in range(replica_count)]
+    delegat.read_your_writes = read_your_writes
+    delegat._replica_connections = [
+        FakeConnection(f"replica{i}", lag_query) for i in range(replica_count)
+    ]
+    delegat._replica_retry_at = [0] * replica_count
+    delegat._replica_checked_at = [None] * replica_count
+    delegat._replica_lag = [None] * replica_count
+    return delegat
+
+
+def test_execute_query_without_config_returns_none(theatre):
+    delegat = theatre.Delegat()
+    assert delegat.execute_query("SELECT 1") is None
+
+
+def test_reads_are_balanced_across_replicas(theatre):
+    delegat = make_delegat(theatre)
+    results = [delegat.execute_query("SELECT 1")[0][0] for _ in range(4)]
+    assert results == ["replica0", "replica1", "replica0", "replica1"]
+
+
+def test_writes_go_to_primary_and_pin_reads(theatre):
+    delegat = make_delegat(theatre, read_your_writes=60)
+    assert delegat.execute_command("UPDATE actors SET staz = 1") == 1
+    assert delegat._connection.queries == ["UPDATE actors SET staz = 1"]
+    assert delegat.execute_query("SELECT 1") == [("primary",)]
+
+
+def test_connection_error_marks_replica_down(theatre):
+    delegat = make_delegat(theatre)
+    delegat._replica_connections[0].error = psycopg2.OperationalError("gone")
+    assert delegat.execute_query("SELECT 1") == [("primary",)]
+    assert delegat._replica_connections[0] is None
+    assert delegat.execute_query("SELECT 1") == [("replica1",)]
+    assert delegat.execute_query("SELECT 1") == [("replica1",)]
+
+
+def test_query_error_keeps_replica(theatre):
+    delegat = make_delegat(theatre)
+    replica = delegat._replica_connections[0]
+    replica.error = psycopg2.ProgrammingError("syntax error")
+    assert delegat.execute_query("SELEC 1") is None
+    assert delegat._replica_connections[0] is replica
+    assert delegat._connection.queries == []
+
+
+def test_non_driver_error_returns_none(theatre):
+    delegat = make_delegat(theatre)
+    delegat._replica_connections[0].error = IndexError("tuple index out of range")
+    assert delegat.execute_query("SELECT %s", ()) is None
+
+
+def test_replica_configs_get_connect_timeout(theatre, monkeypatch):
+    connected = []
+    monkeypatch.setattr(
+        theatre.psycopg2, "connect",
+        lambda **config: connected.append(config) or FakeConnection("conn", "")
+    )
+    replica_configs = [{'host': 'replica1'}, {'host': 'replica2', 'connect_timeout': 7}]
+    theatre.Delegat({'host': 'primary'}, replica_configs)
+    assert connected == [
+        {'host': 'primary'},
+        {'host': 'replica1', 'connect_timeout': theatre.Delegat.REPLICA_CONNECT_TIMEOUT},
+        {'host': 'replica2', 'connect_timeout': 7},
+    ]
+    assert replica_configs == [{'host': 'replica1'}, {'host': 'replica2', 'connect_timeout': 7}]
+
+
+def test_probe_uses_statement_timeout(theatre):
+    delegat = make_delegat(theatre, replica_count=1)
+    delegat.execute_query("SELECT 1")
+    assert delegat._replica_connections[0].settings == [
+        ("SET statement_timeout = %s", (theatre.Delegat.REPLICA_PROBE_TIMEOUT_MS,)),
+        ("RESET statement_timeout", None),
+    ]
+
+
+def test_lagging_replica_is_skipped(theatre):
+    delegat = make_delegat(theatre)
+    delegat._replica_connections[0].lag = theatre.Delegat.MAX_REPLICA_LAG + 1
+    results = [delegat.execute_query("SELECT 1")[0][0] for _ in range(2)]
+    assert results == ["replica1", "replica1"]
+
+
+PRIMARY_DSN = os.environ.get("THEATRE_PRIMARY_DSN")
+REPLICA_DSN = os.environ.get("THEATRE_REPLICA_DSN")
+requires_postgres = pytest.mark.skipif(
+    not (PRIMARY_DSN and REPLICA_DSN),
+    reason="THEATRE_PRIMARY_DSN и THEATRE_REPLICA_DSN не заданы"
+)
+PORT_QUERY = "SELECT current_setting('port')"
+
+
+def server_port(dsn):
+    with psycopg2.connect(dsn) as connection:
+        with connection.cursor() as cursor:
+            cursor.execute(PORT_QUERY)
+            return cursor.fetchone()[0]
+
+
+@requires_postgres
+def test_postgres_reads_use_replica(theatre):
+    delegat = theatre.Delegat({'dsn': PRIMARY_DSN}, [{'dsn': REPLICA_DSN}])
+    assert delegat.execute_query(PORT_QUERY) == [(server_port(REPLICA_DSN),)]
+
+
+@requires_postgres
+def test_postgres_read_your_writes_uses_primary(theatre):
+    delegat = theatre.Delegat({'dsn': PRIMARY_DSN}, [{'dsn': REPLICA_DSN}], read_your_writes=60)
+    delegat.execute_command("SELECT 1")
+    assert delegat.execute_query(PORT_QUERY) == [(server_port(PRIMARY_DSN),)]
+
+
+@requires_postgres
+def test_postgres_falls_back_to_primary(theatre):
+    delegat = theatre.Delegat(
+        {'dsn': PRIMARY_DSN}, [{'dsn': REPLICA_DSN, 'port': 1}]
+    )
+    assert delegat.execute_query(PORT_QUERY) == [(server_port(PRIMARY_DSN),)]